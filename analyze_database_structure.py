@@ -18,21 +18,39 @@ def analyze_current_structure():
     print("CURRENT DATABASE STRUCTURE ANALYSIS")
     print("=" * 60)
     
-    # 1. Check for duplicate device entries
-    print("\n1. DUPLICATE DEVICE NAMES (same device, multiple records):")
+    # One scan of locations feeds all sections below
     cursor.execute('''
-        SELECT device_name, COUNT(*) as occurrences
-        FROM locations 
-        WHERE device_name IS NOT NULL 
-        AND device_name NOT LIKE '%initialized%'
-        AND device_name NOT LIKE '%cleaned%'
-        AND device_name NOT LIKE '%timestamp%'
-        GROUP BY device_name 
-        HAVING COUNT(*) > 0
-        ORDER BY device_name
+        SELECT
+            device_name,
+            region_index,
+            COUNT(*) as occurrences,
+            SUM(LENGTH(device_name)) as chars,
+            (device_name LIKE '%initialized%'
+             OR device_name LIKE '%cleaned%'
+             OR device_name LIKE '%timestamp%') as is_noise
+        FROM locations
+        WHERE device_name IS NOT NULL
+        GROUP BY device_name, region_index
+        ORDER BY device_name, region_index
     ''')
     
-    for device, count in cursor.fetchall():
+    device_counts = defaultdict(int)
+    region_rows = []
+    all_devices = set()
+    total = chars = 0
+    for device, region, count, name_chars, is_noise in cursor.fetchall():
+        all_devices.add(device)
+        total += count
+        chars += name_chars
+        if not is_noise:
+            device_counts[device] += count
+        if device in ('Black Valize', 'Yellow Valize', 'Auto'):
+            region_rows.append((region, device, count))
+    unique = len(all_devices)
+    
+    # 1. Check for duplicate device entries
+    print("\n1. DUPLICATE DEVICE NAMES (same device, multiple records):")
+    for device, count in device_counts.items():
         print(f"   - {device}: {count} record(s)")
     
     # 2. Show the problem with tracking history
@@ -44,32 +62,14 @@ def analyze_current_structure():
     
     # 3. Show reliance on region index
     print("\n3. REGION INDEX DEPENDENCY:")
-    cursor.execute('''
-        SELECT region_index, device_name, COUNT(*) 
-        FROM locations 
-        WHERE device_name IN ('Black Valize', 'Yellow Valize', 'Auto')
-        GROUP BY region_index, device_name
-        ORDER BY device_name, region_index
-    ''')
-    
     print("   Device positions by region index:")
-    for region, device, count in cursor.fetchall():
+    for region, device, count in region_rows:
         print(f"   - Region {region}: {device}")
     
     print("\n   ⚠️  Problem: If AirTags change order in Find My, tracking breaks!")
     
     # 4. Data redundancy
     print("\n4. DATA REDUNDANCY:")
-    cursor.execute('''
-        SELECT 
-            COUNT(*) as total_records,
-            COUNT(DISTINCT device_name) as unique_devices,
-            SUM(LENGTH(device_name)) as total_chars_stored
-        FROM locations
-        WHERE device_name IS NOT NULL
-    ''')
-    
-    total, unique, chars = cursor.fetchone()
     print(f"   - Total location records: {total}")
     print(f"   - Unique devices: {unique}")
     print(f"   - Characters wasted on duplicate names: ~{chars - (unique * 15)}")
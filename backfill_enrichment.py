@@ -146,31 +146,45 @@ def backfill_structured_addresses(dry_run: bool = False) -> int:
             logger.info("No geocoding_cache records need structured address backfill")
             return 0
 
-        updated = 0
+        # Several location texts often share the same coordinates (an alias and its
+        # address, spelling variants), so reverse geocode each pair only once
+        rows_by_coords = {}
         for row in rows:
+            key = (round(row['latitude'], 6), round(row['longitude'], 6))
+            rows_by_coords.setdefault(key, []).append(row)
+
+        updated = 0
+        updates = []
+        for (lat, lon), coord_rows in rows_by_coords.items():
             if dry_run:
-                logger.info(f"[DRY RUN] Would reverse geocode ({row['latitude']}, {row['longitude']}) for '{row['location_text']}'")
-                updated += 1
+                names = ', '.join(f"'{row['location_text']}'" for row in coord_rows)
+                logger.info(f"[DRY RUN] Would reverse geocode ({lat}, {lon}) for {names}")
+                updated += len(coord_rows)
                 continue
 
-            result = geocoder.reverse_geocode(row['latitude'], row['longitude'])
+            result = geocoder.reverse_geocode(lat, lon)
             if result:
-                cursor.execute("""
-                    UPDATE geocoding_cache
-                    SET street = ?, house_number = ?, postal_code = ?, city = ?, country = ?,
-                        address_json = ?
-                    WHERE id = ?
-                """, (
-                    result.get('street'),
-                    result.get('house_number'),
-                    result.get('postal_code'),
-                    result.get('city'),
-                    result.get('country'),
-                    json.dumps(result),
-                    row['id'],
-                ))
-                updated += 1
-                logger.info(f"Enriched '{row['location_text']}' -> {result.get('city')}, {result.get('street')}")
+                address_json = json.dumps(result)
+                for row in coord_rows:
+                    updates.append((
+                        result.get('street'),
+                        result.get('house_number'),
+                        result.get('postal_code'),
+                        result.get('city'),
+                        result.get('country'),
+                        address_json,
+                        row['id'],
+                    ))
+                    logger.info(f"Enriched '{row['location_text']}' -> {result.get('city')}, {result.get('street')}")
+                updated += len(coord_rows)
+
+        if updates:
+            cursor.executemany("""
+                UPDATE geocoding_cache
+                SET street = ?, house_number = ?, postal_code = ?, city = ?, country = ?,
+                    address_json = ?
+                WHERE id = ?
+            """, updates)
 
         if not dry_run:
             conn.commit()
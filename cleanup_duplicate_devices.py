@@ -5,15 +5,20 @@ from pathlib import Path
 from collections import defaultdict
 import re
 
+# Trailing OCR debris stripped from device names, applied in this order
+_TRAILING_DOTS_RE = re.compile(r'\.+$')
+_TRAILING_PERCENT_RE = re.compile(r'\.+%\d+k$')
+_TRAILING_DOTS_SPACE_RE = re.compile(r'\.+\s*$')
+
 def clean_device_name(name):
     """Clean and normalize device names"""
     if not name:
         return name
     
     # Remove trailing dots and special characters
-    name = re.sub(r'\.+$', '', name)
-    name = re.sub(r'\.+%\d+k$', '', name)
-    name = re.sub(r'\.+\s*$', '', name)
+    name = _TRAILING_DOTS_RE.sub('', name)
+    name = _TRAILING_PERCENT_RE.sub('', name)
+    name = _TRAILING_DOTS_SPACE_RE.sub('', name)
     
     # Handle truncated names (keep the longest version)
     return name.strip()
@@ -70,7 +75,9 @@ def find_duplicate_groups():
         print(f"  Count: {len(devices)} devices")
         for device in devices:
             # Look up the count from the dictionary (default to 0 if no locations)
+            # and keep it on the device so consolidation doesn't query again
             location_count = location_counts.get(device['id'], 0)
+            device['location_count'] = location_count
             print(f"  - ID {device['id']}: '{device['name']}' ({location_count} locations)")
     
     conn.close()
@@ -87,27 +94,21 @@ def consolidate_duplicates(dry_run=True):
     print("\n\nCONSOLIDATION PLAN:")
     print("=" * 60)
     
+    if not dry_run:
+        # Take the write lock once up front so the whole merge runs as a
+        # single transaction instead of upgrading on the first UPDATE
+        conn.execute("BEGIN IMMEDIATE")
+    
     for cleaned_name, devices in duplicates.items():
         if not devices:
             continue
             
-        # Get all location counts in one query
-        device_ids = [d['id'] for d in devices]
-        placeholders = ','.join('?' * len(device_ids))
-        cursor.execute(f"""
-            SELECT device_id, COUNT(*) 
-            FROM device_locations 
-            WHERE device_id IN ({placeholders})
-            GROUP BY device_id
-        """, device_ids)
-        location_counts = dict(cursor.fetchall())
-        
         # Choose the primary device (the one with most locations or earliest first_seen)
         primary = None
         max_locations = -1
         
         for device in devices:
-            location_count = location_counts.get(device['id'], 0)
+            location_count = device['location_count']
             
             if location_count > max_locations or (location_count == max_locations and primary is None):
                 max_locations = location_count
@@ -128,27 +129,31 @@ def consolidate_duplicates(dry_run=True):
             """, (cleaned_name, cleaned_name.lower().replace(' ', '_'), primary['id']))
         
         # Merge other devices into primary
-        for device in devices:
-            if device['id'] != primary['id']:
-                print(f"  - Merging ID {device['id']} -> ID {primary['id']}")
-                
-                if not dry_run:
-                    # Update all locations to point to primary device
-                    cursor.execute("""
-                        UPDATE device_locations 
-                        SET device_id = ? 
-                        WHERE device_id = ?
-                    """, (primary['id'], device['id']))
-                    
-                    # Update last_seen on primary if needed
-                    cursor.execute("""
-                        UPDATE devices 
-                        SET last_seen = MAX(last_seen, ?)
-                        WHERE id = ?
-                    """, (device['last_seen'], primary['id']))
-                    
-                    # Delete the duplicate device
-                    cursor.execute("DELETE FROM devices WHERE id = ?", (device['id'],))
+        merge_ids = [d['id'] for d in devices if d['id'] != primary['id']]
+        for merge_id in merge_ids:
+            print(f"  - Merging ID {merge_id} -> ID {primary['id']}")
+        
+        if not dry_run and merge_ids:
+            placeholders = ','.join('?' * len(merge_ids))
+            
+            # Update all locations to point to primary device
+            cursor.execute(f"""
+                UPDATE device_locations 
+                SET device_id = ? 
+                WHERE device_id IN ({placeholders})
+            """, [primary['id'], *merge_ids])
+            
+            # Update last_seen on primary if needed
+            cursor.execute(f"""
+                UPDATE devices 
+                SET last_seen = MAX(last_seen, (
+                    SELECT MAX(last_seen) FROM devices WHERE id IN ({placeholders})
+                ))
+                WHERE id = ?
+            """, [*merge_ids, primary['id']])
+            
+            # Delete the duplicate devices
+            cursor.execute(f"DELETE FROM devices WHERE id IN ({placeholders})", merge_ids)
     
     if dry_run:
         print("\n⚠️  DRY RUN - No changes made")
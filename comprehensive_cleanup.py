@@ -4,27 +4,24 @@ import sqlite3
 from pathlib import Path
 import re
 
+# Known garbage device names left behind by OCR (matched against the lowercased name),
+# fused into one anchored alternation so each name is scanned once. Names shorter
+# than 3 characters are rejected before this runs.
+_GARBAGE_NAME_RE = re.compile(
+    r'^(?:'
+    r'base\.'
+    r'|atesinthelast\d+'
+    r'|herclient'
+    r'|\d+'  # Just numbers
+    r')$'
+)
+
 def is_valid_device_name(name):
     """Check if a device name is valid"""
     if not name or len(name) < 3:
         return False
     
-    # List of known garbage patterns
-    garbage_patterns = [
-        r'^[a-z]$',  # Single letter
-        r'^e$',
-        r'^a$',
-        r'^base\.$',
-        r'^atesinthelast\d+$',
-        r'^herclient$',
-        r'^\d+$',  # Just numbers
-    ]
-    
-    for pattern in garbage_patterns:
-        if re.match(pattern, name.lower()):
-            return False
-    
-    return True
+    return not _GARBAGE_NAME_RE.match(name.lower())
 
 def cleanup_database():
     """Comprehensive database cleanup"""
@@ -9,6 +9,7 @@ with WAL mode, foreign keys, and schema migrations via PRAGMA user_version.
 import re
 import sqlite3
 import logging
+import threading
 from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime, timedelta
@@ -21,7 +22,60 @@ logger = logging.getLogger(__name__)
 DB_PATH = Path("database/airtracker.db")
 
 # Current schema version — bump this when adding migrations
-SCHEMA_VERSION = 4
+SCHEMA_VERSION = 7
+
+# Statements the trackers run on every save. sqlite3 caches prepared statements
+# per connection keyed by SQL text, so keeping one definition guarantees every
+# call hits that cache.
+INSERT_LOCATION_SQL = '''
+    INSERT INTO swift_locations
+    (device_name, location, time_status, distance, latitude, longitude,
+     device_type, raw_data, extracted_at, location_timestamp,
+     distance_from_home_km, battery_status)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+# A NULL device_type (swift_tracker does not know it) keeps the stored one
+UPSERT_DEVICE_SQL = '''
+    INSERT INTO swift_devices (device_name, device_type, last_location, update_count)
+    VALUES (?, ?, ?, 1)
+    ON CONFLICT(device_name) DO UPDATE SET
+        last_seen = CURRENT_TIMESTAMP,
+        last_location = excluded.last_location,
+        device_type = COALESCE(excluded.device_type, device_type),
+        update_count = update_count + 1
+'''
+TOUCH_DEVICE_SQL = '''
+    UPDATE swift_devices SET last_seen = CURRENT_TIMESTAMP
+    WHERE device_name = ?
+'''
+
+# Idle connections kept per thread and database path for reuse by get_connection()
+MAX_IDLE_CONNECTIONS = 4
+_local = threading.local()
+
+
+def _open_connection(path: Path) -> sqlite3.Connection:
+    """Open a connection with the shared pragmas and row_factory applied."""
+    path.parent.mkdir(exist_ok=True)
+
+    conn = sqlite3.connect(str(path), timeout=10)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")  # 64 MiB, allocated lazily
+    conn.execute("PRAGMA mmap_size=268435456")  # Read pages straight from the OS page cache
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.execute("PRAGMA busy_timeout=15000")
+    return conn
+
+
+def _idle_connections(path: Path) -> list:
+    """This thread's idle connections for path."""
+    pools = getattr(_local, 'pools', None)
+    if pools is None:
+        pools = _local.pools = {}
+    return pools.setdefault(str(path), [])
 
 
 @contextmanager
@@ -30,7 +84,13 @@ def get_connection(db_path: Optional[Path] = None):
     Context manager for database connections.
 
     Enables WAL mode for better concurrency (API reads while tracker writes),
-    foreign keys, and row_factory for dict-like access.
+    foreign keys, and row_factory for dict-like access. synchronous=NORMAL is
+    safe under WAL and skips the fsync on every commit (only checkpoints sync).
+
+    Connections are kept open per thread and handed out again, so the tracker
+    and API workers don't pay the open + pragma setup (and a cold page cache)
+    on every call. Nested uses get separate connections, as before, and
+    uncommitted work is rolled back on exit just as closing used to do.
 
     Args:
         db_path: Override database path (defaults to DB_PATH)
@@ -39,17 +99,22 @@ def get_connection(db_path: Optional[Path] = None):
         sqlite3.Connection with row_factory set
     """
     path = db_path or DB_PATH
-    path.parent.mkdir(exist_ok=True)
-
-    conn = sqlite3.connect(str(path), timeout=10)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA foreign_keys=ON")
-    conn.execute("PRAGMA busy_timeout=15000")
+    idle = _idle_connections(path)
+    conn = idle.pop() if idle else _open_connection(path)
     try:
         yield conn
     finally:
-        conn.close()
+        reusable = len(idle) < MAX_IDLE_CONNECTIONS
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Closed or broken by the caller; don't hand it out again
+            reusable = False
+        if reusable:
+            idle.append(conn)
+        else:
+            conn.close()
 
 
 def init_schema():
@@ -74,6 +139,15 @@ def init_schema():
         if current_version < 4:
             _migrate_to_v4(conn)
 
+        if current_version < 5:
+            _migrate_to_v5(conn)
+
+        if current_version < 6:
+            _migrate_to_v6(conn)
+
+        if current_version < 7:
+            _migrate_to_v7(conn)
+
         conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
         conn.commit()
 
@@ -336,6 +410,90 @@ def _migrate_to_v4(conn: sqlite3.Connection):
     logger.info("Migrated database to schema v4")
 
 
+def _migrate_to_v5(conn: sqlite3.Connection):
+    """
+    Migration to v5:
+    - Expression index on rounded geocoding_cache coordinates, matching the
+      ROUND(..., 4) join the API uses to attach structured addresses
+    - Drop idx_geocoding_cache_location_text (duplicates the UNIQUE constraint's index)
+    """
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_geocoding_cache_coords
+        ON geocoding_cache(ROUND(latitude, 4), ROUND(longitude, 4))
+    ''')
+    cursor.execute('DROP INDEX IF EXISTS idx_geocoding_cache_location_text')
+
+    conn.commit()
+    logger.info("Migrated database to schema v5")
+
+
+def _migrate_to_v6(conn: sqlite3.Connection):
+    """
+    Migration to v6:
+    - Composite index on trips(device_name, end_time DESC) so detect_trips'
+      per-device MAX(end_time) is a single index seek
+    - Drop idx_swift_locations_device_name (a prefix of
+      idx_swift_locations_device_timestamp, which serves the same lookups)
+    """
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_trips_device_end
+        ON trips(device_name, end_time DESC)
+    ''')
+    cursor.execute('DROP INDEX IF EXISTS idx_swift_locations_device_name')
+
+    conn.commit()
+    logger.info("Migrated database to schema v6")
+
+
+def _migrate_to_v7(conn: sqlite3.Connection):
+    """
+    Migration to v7:
+    - swift_locations_fts: external-content FTS5 table over swift_locations.location
+      using the trigram tokenizer, so substring (LIKE '%q%') searches can use an
+      index instead of scanning every location row
+    - Triggers keeping it in sync with inserts, updates and deletes
+    """
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS swift_locations_fts USING fts5(
+            location,
+            content='swift_locations',
+            content_rowid='id',
+            tokenize='trigram'
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS swift_locations_fts_ai
+        AFTER INSERT ON swift_locations BEGIN
+            INSERT INTO swift_locations_fts(rowid, location) VALUES (new.id, new.location);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS swift_locations_fts_ad
+        AFTER DELETE ON swift_locations BEGIN
+            INSERT INTO swift_locations_fts(swift_locations_fts, rowid, location)
+            VALUES ('delete', old.id, old.location);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS swift_locations_fts_au
+        AFTER UPDATE OF location ON swift_locations BEGIN
+            INSERT INTO swift_locations_fts(swift_locations_fts, rowid, location)
+            VALUES ('delete', old.id, old.location);
+            INSERT INTO swift_locations_fts(rowid, location) VALUES (new.id, new.location);
+        END
+    ''')
+    cursor.execute("INSERT INTO swift_locations_fts(swift_locations_fts) VALUES ('rebuild')")
+
+    conn.commit()
+    logger.info("Migrated database to schema v7")
+
+
 
 def _import_geocoding_cache(conn: sqlite3.Connection):
     """Import data from the separate geocoding_cache.db if it exists."""
@@ -368,20 +526,29 @@ def _import_geocoding_cache(conn: sqlite3.Connection):
         logger.warning(f"Could not import geocoding cache: {e}")
 
 
-def resolve_location_alias(location: str) -> str:
+def resolve_location_alias(location: str, conn: Optional[sqlite3.Connection] = None) -> str:
     """
     Resolve a location alias (like "Home") to its real address.
 
+    Args:
+        location: Location text as shown in Find My
+        conn: Optional existing database connection to reuse (avoids opening
+              one per lookup inside a batch)
+
     Returns the original location if no alias is found.
     """
+    def _resolve(conn):
+        row = conn.execute(
+            'SELECT address FROM location_aliases WHERE alias = ? COLLATE NOCASE',
+            (location,),
+        ).fetchone()
+        return row[0] if row else location
+
     try:
+        if conn is not None:
+            return _resolve(conn)
         with get_connection() as conn:
-            row = conn.execute(
-                'SELECT address FROM location_aliases WHERE alias = ? COLLATE NOCASE',
-                (location,),
-            ).fetchone()
-            if row:
-                return row[0]
+            return _resolve(conn)
     except Exception:
         pass
     return location
@@ -417,21 +584,34 @@ _STALE_TIME_RE = re.compile(
     re.IGNORECASE,
 )
 
-# Patterns for converting relative time to absolute timestamps.
+# Pattern for converting relative time to absolute timestamps. One alternation with a
+# named group per form, so a status is matched in a single pass and m.lastgroup picks the rule.
 # Uses relativedelta for months so "10 mo ago" on Feb 5 gives Apr 5, not a 300-day guess.
-_RELATIVE_TIME_RULES_TD = [
-    (re.compile(r'^(\d+)\s+min\s+ago$', re.I), lambda m: timedelta(minutes=int(m.group(1)))),
-    (re.compile(r'^(\d+)\s+(?:hr|hours?)\s+ago$', re.I), lambda m: timedelta(hours=int(m.group(1)))),
-    (re.compile(r'^(\d+)\s+days?\s+ago$', re.I), lambda m: timedelta(days=int(m.group(1)))),
-    (re.compile(r'^(\d+)\s+weeks?\s+ago$', re.I), lambda m: timedelta(weeks=int(m.group(1)))),
-    (re.compile(r'^Yesterday$', re.I), lambda m: timedelta(days=1)),
-    (re.compile(r'^Last\s+week$', re.I), lambda m: timedelta(weeks=1)),
-    (re.compile(r'^Now$', re.I), lambda m: timedelta(seconds=0)),
-]
-_RELATIVE_TIME_RULES_RD = [
-    (re.compile(r'^(\d+)\s+mo\s+ago$', re.I), lambda m: relativedelta(months=int(m.group(1)))),
-    (re.compile(r'^Last\s+mo$', re.I), lambda m: relativedelta(months=1)),
-]
+_RELATIVE_TIME_RE = re.compile(
+    r'^(?:'
+    r'(?P<min>\d+)\s+min\s+ago'
+    r'|(?P<hr>\d+)\s+(?:hr|hours?)\s+ago'
+    r'|(?P<day>\d+)\s+days?\s+ago'
+    r'|(?P<week>\d+)\s+weeks?\s+ago'
+    r'|(?P<mo>\d+)\s+mo\s+ago'
+    r'|(?P<yesterday>Yesterday)'
+    r'|(?P<last_week>Last\s+week)'
+    r'|(?P<last_mo>Last\s+mo)'
+    r'|(?P<now>Now)'
+    r')$',
+    re.IGNORECASE,
+)
+_RELATIVE_TIME_DELTAS = {
+    'min': lambda v: timedelta(minutes=int(v)),
+    'hr': lambda v: timedelta(hours=int(v)),
+    'day': lambda v: timedelta(days=int(v)),
+    'week': lambda v: timedelta(weeks=int(v)),
+    'mo': lambda v: relativedelta(months=int(v)),
+    'yesterday': lambda v: timedelta(days=1),
+    'last_week': lambda v: timedelta(weeks=1),
+    'last_mo': lambda v: relativedelta(months=1),
+    'now': lambda v: timedelta(seconds=0),
+}
 
 
 def _time_status_to_timestamp(time_status: str, base_time: Optional[datetime] = None) -> Optional[str]:
@@ -448,19 +628,15 @@ def _time_status_to_timestamp(time_status: str, base_time: Optional[datetime] =
     Returns:
         ISO timestamp string, or None if the pattern is not recognized (e.g. "Paused").
     """
+    m = _RELATIVE_TIME_RE.match(time_status)
+    if not m:
+        return None
     now = base_time or datetime.now()
-    for pattern, delta_fn in _RELATIVE_TIME_RULES_TD:
-        m = pattern.match(time_status)
-        if m:
-            return (now - delta_fn(m)).strftime('%Y-%m-%d %H:%M:%S')
-    for pattern, delta_fn in _RELATIVE_TIME_RULES_RD:
-        m = pattern.match(time_status)
-        if m:
-            return (now - delta_fn(m)).strftime('%Y-%m-%d %H:%M:%S')
-    return None
-
-
-def sanitize_device_data(device_data: Dict) -> Optional[Dict]:
+    delta = _RELATIVE_TIME_DELTAS[m.lastgroup](m.group(m.lastgroup))
+    return (now - delta).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def sanitize_device_data(device_data: Dict, now: Optional[datetime] = None) -> Optional[Dict]:
     """
     Clean up parsed device data from the Swift extractor.
 
@@ -476,6 +652,8 @@ def sanitize_device_data(device_data: Dict) -> Optional[Dict]:
 
     Args:
         device_data: Dict with keys name, location, timeStatus, distance, rawText
+        now: Reference time for relative statuses (defaults to now). Pass one
+             value for a whole batch so every record shares the same clock.
 
     Returns:
         Cleaned dict, or None if the record should be skipped entirely.
@@ -531,7 +709,7 @@ def sanitize_device_data(device_data: Dict) -> Optional[Dict]:
         device_data['distance'] = '-'
 
     # Convert relative time status to absolute timestamp
-    location_timestamp = _time_status_to_timestamp(device_data.get('timeStatus', ''))
+    location_timestamp = _time_status_to_timestamp(device_data.get('timeStatus', ''), base_time=now)
     if location_timestamp:
         device_data['location_timestamp'] = location_timestamp
 
@@ -545,33 +723,57 @@ def sanitize_device_data(device_data: Dict) -> Optional[Dict]:
     return device_data
 
 
-def resolve_device_alias(device_name: str) -> str:
+def resolve_device_alias(device_name: str, conn: Optional[sqlite3.Connection] = None) -> str:
     """
     Resolve a device alias (like a phone number) to its canonical name.
 
     Find My sometimes shows phone numbers instead of contact names.
     The device_aliases table maps these to the correct name.
 
+    Args:
+        device_name: Device name as shown in Find My
+        conn: Optional existing database connection to reuse
+
     Returns the original name if no alias is found.
     """
+    def _resolve(conn):
+        row = conn.execute(
+            'SELECT canonical_name FROM device_aliases WHERE alias = ?',
+            (device_name,),
+        ).fetchone()
+        return row[0] if row else device_name
+
     try:
+        if conn is not None:
+            return _resolve(conn)
         with get_connection() as conn:
-            row = conn.execute(
-                'SELECT canonical_name FROM device_aliases WHERE alias = ?',
-                (device_name,),
-            ).fetchone()
-            if row:
-                return row[0]
+            return _resolve(conn)
     except Exception:
         pass
     return device_name
 
 
+def load_device_aliases(conn: sqlite3.Connection) -> Dict[str, str]:
+    """
+    Load the whole device_aliases table as an alias -> canonical name dict.
+
+    Lets a batch resolve every device name with dict lookups instead of one
+    query (and connection) per device. Returns an empty dict if the table
+    does not exist.
+    """
+    try:
+        return dict(conn.execute('SELECT alias, canonical_name FROM device_aliases').fetchall())
+    except sqlite3.Error:
+        return {}
+
+
 def is_duplicate(
     conn: sqlite3.Connection,
     device_name: str,
     location: str,
     heartbeat_minutes: int = 60,
+    now: Optional[datetime] = None,
+    pending: Optional[Dict[str, str]] = None,
 ) -> bool:
     """
     Skip saving if the device is still at the same location.
@@ -585,10 +787,16 @@ def is_duplicate(
         device_name: Device name to check
         location: Location text to check
         heartbeat_minutes: Max time between records at same location (default 60)
+        now: Reference time (defaults to now); pass the batch time when checking many devices
+        pending: Optional dict of device_name -> location queued in the current
+                 batch; those rows are not in the table yet, so they are checked first
 
     Returns:
         True if the record should be skipped (duplicate)
     """
+    if pending is not None and device_name in pending:
+        return pending[device_name] == location
+
     row = conn.execute(
         '''
         SELECT location, timestamp FROM swift_locations
@@ -609,5 +817,5 @@ def is_duplicate(
         return False
 
     # Same location — only save if heartbeat interval has passed
-    cutoff = (datetime.now() - timedelta(minutes=heartbeat_minutes)).isoformat()
+    cutoff = ((now or datetime.now()) - timedelta(minutes=heartbeat_minutes)).isoformat()
     return last_timestamp > cutoff
@@ -15,9 +15,10 @@ def final_cleanup():
     # 1. Remove garbage entries
     print("\n1. Removing garbage entries...")
     garbage_ids = [29]  # "o F eee"
+    placeholders = ','.join('?' * len(garbage_ids))
+    cursor.execute(f"DELETE FROM device_locations WHERE device_id IN ({placeholders})", garbage_ids)
+    cursor.execute(f"DELETE FROM devices WHERE id IN ({placeholders})", garbage_ids)
     for device_id in garbage_ids:
-        cursor.execute("DELETE FROM device_locations WHERE device_id = ?", (device_id,))
-        cursor.execute("DELETE FROM devices WHERE id = ?", (device_id,))
         print(f"   Removed device ID {device_id}")
     
     # 2. Consolidate all Jelliede Bellie variants
@@ -51,19 +52,23 @@ def final_cleanup():
         print(f"   Primary: '{primary[1]}' (ID: {primary[0]})")
         
         # Merge all others into primary
+        duplicate_ids = []
         for device_id, name in jelliede_devices:
             if device_id != primary[0]:
                 print(f"   Merging: '{name}' (ID: {device_id}) -> Primary")
-                
-                # Move all locations
-                cursor.execute("""
-                    UPDATE device_locations 
-                    SET device_id = ? 
-                    WHERE device_id = ?
-                """, (primary[0], device_id))
-                
-                # Delete duplicate
-                cursor.execute("DELETE FROM devices WHERE id = ?", (device_id,))
+                duplicate_ids.append(device_id)
+        
+        placeholders = ','.join('?' * len(duplicate_ids))
+        
+        # Move all locations
+        cursor.execute(f"""
+            UPDATE device_locations 
+            SET device_id = ? 
+            WHERE device_id IN ({placeholders})
+        """, [primary[0]] + duplicate_ids)
+        
+        # Delete duplicates
+        cursor.execute(f"DELETE FROM devices WHERE id IN ({placeholders})", duplicate_ids)
     
     # 3. Update last_seen for all devices
     print("\n3. Updating last_seen timestamps...")
@@ -32,6 +32,14 @@ class FindMyAutomation:
     # Max retries for tab switch verification
     TAB_SWITCH_MAX_RETRIES = 2
 
+    # AppleScript that waits (up to 0.5s) for the process to come to the front
+    # instead of a fixed delay, so it returns at once when already frontmost
+    WAIT_FRONTMOST = '''
+                    repeat 10 times
+                        if frontmost then exit repeat
+                        delay 0.05
+                    end repeat'''
+
     def __init__(self):
         """Initialize the automation module."""
         self.app_name = "FindMy"
@@ -159,8 +167,7 @@ class FindMyAutomation:
             applescript = f'''
             tell application "System Events"
                 tell process "{self.app_name}"
-                    set frontmost to true
-                    delay 0.5
+                    set frontmost to true{self.WAIT_FRONTMOST}
                     click menu item "{menu_item}" of menu "View" of menu bar 1
                 end tell
             end tell
@@ -215,8 +222,7 @@ class FindMyAutomation:
         applescript = f'''
         tell application "System Events"
             tell process "{self.app_name}"
-                set frontmost to true
-                delay 0.3
+                set frontmost to true{self.WAIT_FRONTMOST}
                 keystroke "r" using command down
             end tell
         end tell
@@ -544,21 +550,15 @@ class FindMyAutomation:
         Returns:
             True if running, False otherwise
         """
-        applescript = f'''
-        tell application "System Events"
-            return (name of processes) contains "{self.app_name}"
-        end tell
-        '''
-
+        # pgrep avoids an AppleScript/System Events round trip; exit code 0
+        # means a process with exactly this name exists
         try:
             result = subprocess.run(
-                ['osascript', '-e', applescript],
-                check=True,
+                ['pgrep', '-x', self.app_name],
                 capture_output=True,
-                text=True,
                 timeout=5
             )
-            return result.stdout.strip() == 'true'
+            return result.returncode == 0
         except Exception as e:
             logger.error(f"Failed to check if {self.app_name} is running: {e}")
             return False
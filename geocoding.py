@@ -6,19 +6,38 @@ Converts location names to geographic coordinates using OpenStreetMap's Nominati
 
 import requests
 import json
+import re
 import time
 import logging
+from collections import OrderedDict
 from typing import Tuple, Optional, Dict
 from pathlib import Path
-from datetime import datetime, timedelta
 
-from db import get_connection
+from db import get_connection, resolve_location_alias
 
 logger = logging.getLogger(__name__)
 
+# Find My status suffixes stripped before geocoding
+_STATUS_SUFFIX_RE = re.compile(r', [Pp]aused')
+
+# Belgian city names (substring match) that get ", Belgium" appended
+_BELGIAN_CITY_RE = re.compile(r'Ghent|Gent|Brussels?|Antwerp(?:en)?')
+
 
 class Geocoder:
     """Handles geocoding of location names to coordinates"""
+
+    # In-process LRU in front of the SQLite cache. Failed lookups are kept in
+    # memory only briefly so a cache row resolved by another process is picked
+    # up; the SQLite negative entry still suppresses Nominatim retries for
+    # negative_cache_hours.
+    MEMORY_CACHE_SIZE = 4096
+    MEMORY_NEGATIVE_TTL_SECONDS = 600
+
+    # Statuses Nominatim uses to ask clients to back off, and the pause used
+    # when it does not say how long
+    THROTTLE_STATUSES = (429, 503)
+    DEFAULT_RETRY_AFTER_SECONDS = 60
     
     def __init__(self, config_path: str = "config.json"):
         """
@@ -28,6 +47,37 @@ class Geocoder:
             config_path: Path to configuration file
         """
         self.config = self._load_config(config_path)
+        self.custom_locations = self._load_custom_locations(config_path)
+        self._next_request_at = 0.0  # time.monotonic() when the next request may go out
+        self._min_request_interval = None  # batch_geocode() override of rate_limit_seconds
+        self._throttled = False  # last request was refused with 429/503
+        self._request_failed = False  # last request got no usable answer (timeout, error status, ...)
+        self._memory_cache = OrderedDict()  # key -> (expires_at or None, result)
+
+        # One keep-alive session for all Nominatim calls instead of a new
+        # TCP+TLS handshake per lookup
+        self.http = requests.Session()
+        self.http.headers.update({'User-Agent': self.config.get('user_agent', 'AirTracker/1.0')})
+
+    def _memory_get(self, key):
+        """Return (True, result) on an in-memory hit, (False, None) otherwise."""
+        entry = self._memory_cache.get(key)
+        if entry is None:
+            return False, None
+        expires_at, result = entry
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del self._memory_cache[key]
+            return False, None
+        self._memory_cache.move_to_end(key)
+        return True, result
+
+    def _memory_put(self, key, result, negative: bool = False):
+        """Remember a result, evicting the least recently used entry when full."""
+        expires_at = time.monotonic() + self.MEMORY_NEGATIVE_TTL_SECONDS if negative else None
+        self._memory_cache[key] = (expires_at, result)
+        self._memory_cache.move_to_end(key)
+        if len(self._memory_cache) > self.MEMORY_CACHE_SIZE:
+            self._memory_cache.popitem(last=False)
 
     def _load_config(self, config_path: str) -> Dict:
         """Load geocoding configuration"""
@@ -40,7 +90,8 @@ class Geocoder:
                     'timeout_seconds': 10,
                     'user_agent': 'AirTracker/1.0',
                     'cache_results': True,
-                    'cache_duration_days': 7
+                    'cache_duration_days': 7,
+                    'negative_cache_hours': 24
                 })
         except Exception as e:
             logger.warning(f"Could not load config: {e}. Using defaults.")
@@ -50,64 +101,87 @@ class Geocoder:
                 'timeout_seconds': 10,
                 'user_agent': 'AirTracker/1.0',
                 'cache_results': True,
-                'cache_duration_days': 7
+                'cache_duration_days': 7,
+                'negative_cache_hours': 24
             }
 
-    def _check_cache(self, location_text: str) -> Optional[Tuple[float, float]]:
-        """Check if location is in cache (main database) and not expired"""
+    def _check_cache(self, location_text: str) -> Optional[Tuple[Optional[float], Optional[float]]]:
+        """
+        Check if location is in cache (main database) and not expired.
+
+        Returns (None, None) for a cached failed lookup, so callers can skip
+        the HTTP request, and None on a cache miss.
+        """
         if not self.config.get('cache_results', True):
             return None
 
-        cache_days = self.config.get('cache_duration_days', 7)
-        cutoff_date = datetime.now() - timedelta(days=cache_days)
+        # created_at defaults to CURRENT_TIMESTAMP (UTC), so expire in SQL
+        cache_age = f"-{self.config.get('cache_duration_days', 7)} days"
+        negative_age = f"-{self.config.get('negative_cache_hours', 24)} hours"
 
         with get_connection() as conn:
             cursor = conn.cursor()
+            # Failed lookups are stored as NULL and expire sooner, since they
+            # may come from a transient network error
             cursor.execute('''
                 SELECT latitude, longitude
                 FROM geocoding_cache
-                WHERE location_text = ? AND created_at > ?
-            ''', (location_text.strip(), cutoff_date))
+                WHERE location_text = ?
+                  AND created_at > CASE WHEN latitude IS NULL THEN datetime('now', ?) ELSE datetime('now', ?) END
+            ''', (location_text.strip(), negative_age, cache_age))
 
             result = cursor.fetchone()
 
-        if result and result[0] is not None and result[1] is not None:
+        if result is None:
+            return None
+
+        if result[0] is not None and result[1] is not None:
             logger.debug(f"Cache hit for '{location_text}'")
             return (result[0], result[1])
 
-        return None
+        logger.debug(f"Negative cache hit for '{location_text}'")
+        return (None, None)
 
     def _check_cache_full(self, location_text: str) -> Optional[Dict]:
-        """Check cache for full structured address data."""
+        """
+        Check cache for full structured address data.
+
+        A cached failed lookup is returned as a dict with latitude None.
+        """
         if not self.config.get('cache_results', True):
             return None
 
-        cache_days = self.config.get('cache_duration_days', 7)
-        cutoff_date = datetime.now() - timedelta(days=cache_days)
+        # created_at defaults to CURRENT_TIMESTAMP (UTC), so expire in SQL
+        cache_age = f"-{self.config.get('cache_duration_days', 7)} days"
+        negative_age = f"-{self.config.get('negative_cache_hours', 24)} hours"
 
         with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT latitude, longitude, street, house_number, postal_code, city, country, address_json
                 FROM geocoding_cache
-                WHERE location_text = ? AND created_at > ?
-            ''', (location_text.strip(), cutoff_date))
+                WHERE location_text = ?
+                  AND created_at > CASE WHEN latitude IS NULL THEN datetime('now', ?) ELSE datetime('now', ?) END
+            ''', (location_text.strip(), negative_age, cache_age))
 
             result = cursor.fetchone()
 
-        if result and result[0] is not None and result[1] is not None:
-            return {
-                'latitude': result[0],
-                'longitude': result[1],
-                'street': result[2],
-                'house_number': result[3],
-                'postal_code': result[4],
-                'city': result[5],
-                'country': result[6],
-                'address_json': result[7],
-            }
+        if result is None:
+            return None
 
-        return None
+        if result[0] is None or result[1] is None:
+            return {'latitude': None, 'longitude': None}
+
+        return {
+            'latitude': result[0],
+            'longitude': result[1],
+            'street': result[2],
+            'house_number': result[3],
+            'postal_code': result[4],
+            'city': result[5],
+            'country': result[6],
+            'address_json': result[7],
+        }
 
     def _save_to_cache(self, location_text: str, latitude: Optional[float], longitude: Optional[float],
                        address: Optional[Dict] = None):
@@ -157,25 +231,58 @@ class Geocoder:
             return ""
         
         # Remove time-related suffixes
-        text = location_text.strip()
-        text = text.replace(", Paused", "")
-        text = text.replace(", paused", "")
+        text = _STATUS_SUFFIX_RE.sub("", location_text.strip())
         
         # Remove "No location found" type entries
         if "No location found" in text:
             return ""
         
         # Add country context for Belgian cities if not present
-        belgian_cities = ["Ghent", "Gent", "Brussels", "Brussel", "Antwerp", "Antwerpen"]
-        for city in belgian_cities:
-            if city in text and "Belgium" not in text:
-                text += ", Belgium"
+        if "Belgium" not in text and _BELGIAN_CITY_RE.search(text):
+            text += ", Belgium"
         
         return text
     
     def _rate_limit(self):
-        """Sleep to respect the Nominatim rate limit."""
-        time.sleep(self.config.get('rate_limit_seconds', 1.1))
+        """
+        Sleep to respect the Nominatim rate limit.
+
+        Only waits for whatever is left of the interval since the previous
+        request, so a lookup after a quiet period goes out immediately.
+        """
+        wait = self._next_request_at - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        interval = self.config.get('rate_limit_seconds', 1.1)
+        if self._min_request_interval is not None:
+            interval = max(interval, self._min_request_interval)
+        self._next_request_at = time.monotonic() + interval
+        self._throttled = False
+        self._request_failed = False
+
+    def _check_throttled(self, response) -> bool:
+        """
+        Honour a 429/503 from Nominatim by holding off the next request.
+
+        Uses the Retry-After header when it gives a number of seconds, and
+        DEFAULT_RETRY_AFTER_SECONDS otherwise.
+
+        Returns:
+            True if the response was a throttle response
+        """
+        if response.status_code not in self.THROTTLE_STATUSES:
+            return False
+
+        try:
+            delay = float(response.headers.get('Retry-After', self.DEFAULT_RETRY_AFTER_SECONDS))
+        except ValueError:
+            # HTTP-date form; not worth parsing for a rough back-off
+            delay = self.DEFAULT_RETRY_AFTER_SECONDS
+
+        self._next_request_at = max(self._next_request_at, time.monotonic() + delay)
+        self._throttled = True
+        logger.warning(f"Nominatim returned status {response.status_code}, backing off {delay:.0f}s")
+        return True
 
     def geocode_nominatim(self, location_text: str) -> Tuple[Optional[float], Optional[float]]:
         """
@@ -197,15 +304,10 @@ class Geocoder:
             'addressdetails': 1
         }
         
-        headers = {
-            'User-Agent': self.config.get('user_agent', 'AirTracker/1.0')
-        }
-        
         try:
-            response = requests.get(
+            response = self.http.get(
                 url, 
                 params=params, 
-                headers=headers,
                 timeout=self.config.get('timeout_seconds', 10)
             )
             
@@ -217,12 +319,15 @@ class Geocoder:
                     lon = float(result['lon'])
                     logger.info(f"Geocoded '{location_text}' -> ({lat:.6f}, {lon:.6f})")
                     return (lat, lon)
-            else:
+            elif not self._check_throttled(response):
+                self._request_failed = True
                 logger.warning(f"Nominatim returned status {response.status_code}")
                 
         except requests.exceptions.Timeout:
+            self._request_failed = True
             logger.error(f"Timeout geocoding '{location_text}'")
         except Exception as e:
+            self._request_failed = True
             logger.error(f"Error geocoding '{location_text}': {e}")
         
         return (None, None)
@@ -245,15 +350,10 @@ class Geocoder:
             'addressdetails': 1,
         }
 
-        headers = {
-            'User-Agent': self.config.get('user_agent', 'AirTracker/1.0')
-        }
-
         try:
-            response = requests.get(
+            response = self.http.get(
                 url,
                 params=params,
-                headers=headers,
                 timeout=self.config.get('timeout_seconds', 10),
             )
 
@@ -271,10 +371,14 @@ class Geocoder:
                         'city': addr.get('city') or addr.get('town') or addr.get('village'),
                         'country': addr.get('country'),
                     }
+            elif not self._check_throttled(response):
+                self._request_failed = True
 
         except requests.exceptions.Timeout:
+            self._request_failed = True
             logger.error(f"Timeout geocoding '{location_text}'")
         except Exception as e:
+            self._request_failed = True
             logger.error(f"Error geocoding '{location_text}': {e}")
 
         return None
@@ -294,7 +398,7 @@ class Geocoder:
         # Check cache by coordinate key
         coord_key = f"@reverse:{lat:.6f},{lon:.6f}"
         cached = self._check_cache_full(coord_key)
-        if cached:
+        if cached and cached['latitude'] is not None:
             return cached
 
         url = "https://nominatim.openstreetmap.org/reverse"
@@ -306,17 +410,12 @@ class Geocoder:
             'addressdetails': 1,
         }
 
-        headers = {
-            'User-Agent': self.config.get('user_agent', 'AirTracker/1.0')
-        }
-
         try:
             self._rate_limit()
 
-            response = requests.get(
+            response = self.http.get(
                 url,
                 params=params,
-                headers=headers,
                 timeout=self.config.get('timeout_seconds', 10),
             )
 
@@ -337,6 +436,8 @@ class Geocoder:
                 # Cache the reverse result
                 self._save_to_cache(coord_key, lat, lon, address=result)
                 return result
+            else:
+                self._check_throttled(response)
 
         except requests.exceptions.Timeout:
             logger.error(f"Timeout reverse geocoding ({lat}, {lon})")
@@ -351,7 +452,8 @@ class Geocoder:
 
         Returns:
             Dict with latitude, longitude, street, house_number, postal_code, city, country,
-            or None if geocoding failed.
+            or None if geocoding failed. Custom coordinates from config only carry
+            latitude and longitude.
         """
         if not location_text:
             return None
@@ -360,9 +462,24 @@ class Geocoder:
         if not cleaned_text:
             return None
 
+        # Custom coordinates from config win, as in geocode()
+        custom_result = self._check_custom_locations(cleaned_text)
+        if custom_result:
+            return {'latitude': custom_result[0], 'longitude': custom_result[1]}
+
+        memory_key = ('full', cleaned_text)
+        hit, result = self._memory_get(memory_key)
+        if hit:
+            return result
+
         # Check cache for full data
         cached = self._check_cache_full(cleaned_text)
         if cached:
+            # A cached failure means Nominatim had nothing last time
+            if cached['latitude'] is None:
+                self._memory_put(memory_key, None, negative=True)
+                return None
+            self._memory_put(memory_key, cached)
             return cached
 
         # Geocode with full address details
@@ -370,12 +487,46 @@ class Geocoder:
 
         if result:
             self._save_to_cache(cleaned_text, result['latitude'], result['longitude'], address=result)
+            self._memory_put(memory_key, result)
             return result
 
-        # Save failed result to avoid repeated lookups
-        self._save_to_cache(cleaned_text, None, None)
+        # Save failed result to avoid repeated lookups, but only when Nominatim
+        # actually answered with no match
+        if not (self._throttled or self._request_failed):
+            self._save_to_cache(cleaned_text, None, None)
+            self._memory_put(memory_key, None, negative=True)
         return None
 
+    def _load_custom_locations(self, config_path: str) -> Dict[str, Tuple[float, float]]:
+        """
+        Load custom coordinates from config once, keyed by lowercased name
+
+        Args:
+            config_path: Path to configuration file
+
+        Returns:
+            Dictionary mapping lowercased location name to (latitude, longitude)
+        """
+        custom_locations = {}
+        try:
+            with open(config_path, 'r') as f:
+                config = json.load(f)
+            for custom_name, coords in config.get('locations', {}).get('custom_coordinates', {}).items():
+                # Handle European decimal format (comma instead of dot)
+                lat_str = str(coords.get('latitude', '')).replace(',', '.')
+                lon_str = str(coords.get('longitude', '')).replace(',', '.')
+
+                if lat_str and lon_str:
+                    try:
+                        custom_locations[custom_name.lower()] = (float(lat_str), float(lon_str))
+                    except ValueError:
+                        logger.warning(f"Invalid coordinates for custom location '{custom_name}'")
+
+        except Exception as e:
+            logger.debug(f"Could not load custom locations: {e}")
+
+        return custom_locations
+
     def _check_custom_locations(self, location_text: str) -> Optional[Tuple[float, float]]:
         """
         Check if location matches any custom coordinates from config
@@ -386,31 +537,11 @@ class Geocoder:
         Returns:
             Tuple of (latitude, longitude) or None if not found
         """
-        try:
-            with open('config.json', 'r') as f:
-                config = json.load(f)
-                custom_locations = config.get('locations', {}).get('custom_coordinates', {})
-                
-                # Check exact match (case-insensitive)
-                for custom_name, coords in custom_locations.items():
-                    if location_text.lower() == custom_name.lower():
-                        # Handle European decimal format (comma instead of dot)
-                        lat_str = str(coords.get('latitude', '')).replace(',', '.')
-                        lon_str = str(coords.get('longitude', '')).replace(',', '.')
-                        
-                        if lat_str and lon_str:
-                            try:
-                                lat = float(lat_str)
-                                lon = float(lon_str)
-                                logger.info(f"Using custom coordinates for '{location_text}': ({lat:.6f}, {lon:.6f})")
-                                return (lat, lon)
-                            except ValueError:
-                                logger.warning(f"Invalid coordinates for custom location '{custom_name}'")
-                                
-        except Exception as e:
-            logger.debug(f"Could not load custom locations: {e}")
-            
-        return None
+        # Exact match (case-insensitive)
+        coords = self.custom_locations.get(location_text.lower())
+        if coords:
+            logger.info(f"Using custom coordinates for '{location_text}': ({coords[0]:.6f}, {coords[1]:.6f})")
+        return coords
     
     def geocode(self, location_text: str) -> Tuple[Optional[float], Optional[float]]:
         """
@@ -435,9 +566,15 @@ class Geocoder:
         if custom_result:
             return custom_result
         
+        memory_key = ('coords', cleaned_text)
+        hit, result = self._memory_get(memory_key)
+        if hit:
+            return result
+        
         # Check cache
         cached_result = self._check_cache(cleaned_text)
         if cached_result:
+            self._memory_put(memory_key, cached_result, negative=cached_result[0] is None)
             return cached_result
         
         # Geocode based on provider
@@ -449,8 +586,11 @@ class Geocoder:
             logger.error(f"Unknown geocoding provider: {provider}")
             return (None, None)
         
-        # Save to cache (even if None to avoid repeated failed lookups)
-        self._save_to_cache(cleaned_text, lat, lon)
+        # Save to cache (even if None to avoid repeated failed lookups), but only
+        # when Nominatim actually answered with no match
+        if lat is not None or not (self._throttled or self._request_failed):
+            self._save_to_cache(cleaned_text, lat, lon)
+            self._memory_put(memory_key, (lat, lon), negative=lat is None)
         
         return (lat, lon)
     
@@ -458,28 +598,69 @@ class Geocoder:
         """
         Geocode multiple locations with rate limiting
         
+        Each distinct location is looked up once. Spacing is left to
+        _rate_limit(), so cache hits and custom coordinates never wait.
+        
         Args:
             locations: List of location strings
-            delay_seconds: Delay between requests (uses config if not specified)
+            delay_seconds: Minimum delay between network requests (uses config if not specified)
             
         Returns:
             Dictionary mapping location text to (lat, lon) tuples
         """
-        if delay_seconds is None:
-            delay_seconds = self.config.get('rate_limit_seconds', 1.1)
-        
         results = {}
         
-        for i, location in enumerate(locations):
-            if i > 0:  # Don't delay before first request
-                time.sleep(delay_seconds)
-            
-            lat, lon = self.geocode(location)
-            if lat and lon:
-                results[location] = (lat, lon)
+        self._min_request_interval = delay_seconds
+        try:
+            for location in dict.fromkeys(locations):
+                lat, lon = self.geocode(location)
+                if lat and lon:
+                    results[location] = (lat, lon)
+        finally:
+            self._min_request_interval = None
         
         return results
 
+    def geocode_alias(self, location_text: str, conn=None, seen: Optional[Dict[str, Tuple]] = None,
+                      full: bool = False) -> Tuple[Optional[float], Optional[float]]:
+        """
+        Resolve a location alias and geocode the result.
+
+        Args:
+            location_text: Location as shown in Find My
+            conn: Optional existing database connection for the alias lookup
+            seen: Optional dict of location text -> (lat, lon) already looked up
+                  in this batch, so devices at the same place share one lookup
+            full: Look up through geocode_full() so the cache row carries
+                  structured address fields
+
+        Returns:
+            Tuple of (latitude, longitude), (None, None) if geocoding failed
+        """
+        if seen is not None and location_text in seen:
+            return seen[location_text]
+
+        # Resolve alias (e.g. "Home" → "Onderstraat 7, 9000 Ghent")
+        geocode_text = resolve_location_alias(location_text, conn=conn)
+
+        latitude, longitude = None, None
+        try:
+            if full:
+                geo_result = self.geocode_full(geocode_text)
+                if geo_result:
+                    latitude = geo_result['latitude']
+                    longitude = geo_result['longitude']
+            else:
+                latitude, longitude = self.geocode(geocode_text)
+            if latitude and longitude:
+                logger.debug(f"Geocoded {location_text} -> ({latitude:.6f}, {longitude:.6f})")
+        except Exception as e:
+            logger.warning(f"Geocoding failed for '{geocode_text}': {e}")
+
+        if seen is not None:
+            seen[location_text] = (latitude, longitude)
+        return latitude, longitude
+
 
 # Convenience function for quick geocoding
 def geocode_location(location_text: str) -> Tuple[Optional[float], Optional[float]]:
@@ -4,18 +4,44 @@
 Improved AirTracker with proper relational database structure
 """
 
+import re
 import sqlite3
 from datetime import datetime
+from functools import lru_cache
+
+# Name keyword -> device type, found in one search. The earliest keyword in the
+# name decides; at the same position branches keep the old if/elif priority.
+_DEVICE_TYPE_RE = re.compile(
+    r'(?P<keys>key)'
+    r'|(?P<bag>bag|pack)'
+    r'|(?P<luggage>valize)'
+    r'|(?P<vehicle>auto|car)'
+    r'|(?P<wallet>wallet|portefeu)',
+    re.IGNORECASE,
+)
+
+
+@lru_cache(maxsize=1024)
+def _device_type_for(device_name):
+    """Device type for a name; cached since the same names recur every cycle"""
+    m = _DEVICE_TYPE_RE.search(device_name)
+    return m.lastgroup if m else 'airtag'
 
 class ImprovedAirTracker:
     def __init__(self, db_path="database/airtracker_improved.db"):
         self.db_path = db_path
+        self._device_cache = {}  # device_name -> device id
         self.init_database()
     
     def init_database(self):
         """Initialize improved database schema"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        # One long-lived connection; WAL + synchronous=NORMAL avoids a full
+        # fsync on every commit
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA temp_store=MEMORY')
+        cursor = self.conn.cursor()
         
         # Create screenshots table
         cursor.execute('''
@@ -56,88 +82,92 @@ class ImprovedAirTracker:
         ''')
         
         # Create indexes
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_device_locations_device_id ON device_locations(device_id)')
+        # (device_id, timestamp_unix) serves per-device history and latest-location
+        # lookups without a sort, and covers plain device_id lookups too
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_device_locations_device_ts ON device_locations(device_id, timestamp_unix DESC)')
+        cursor.execute('DROP INDEX IF EXISTS idx_device_locations_device_id')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_device_locations_timestamp ON device_locations(timestamp_unix)')
         
-        conn.commit()
-        conn.close()
+        self.conn.commit()
     
     def get_or_create_device(self, device_name):
         """Get device ID, creating if necessary"""
-        with sqlite3.connect(self.db_path) as conn:  # Use context manager
-            cursor = conn.cursor()
+        # Devices are never renamed or deleted here, so a hit is always valid
+        cached_id = self._device_cache.get(device_name)
+        if cached_id is not None:
+            return cached_id
+
+        with self.conn:  # Commits on success, rolls back on error
+            cursor = self.conn.cursor()
             
-            # Use INSERT ... ON CONFLICT for an atomic operation
+            # RETURNING yields the id only when the row was actually inserted,
+            # so a new device costs a single statement
             device_type = self.guess_device_type(device_name)
             cursor.execute('''
                 INSERT INTO devices (device_name, device_type)
                 VALUES (?, ?)
                 ON CONFLICT(device_name) DO NOTHING
+                RETURNING id
             ''', (device_name, device_type))
-            
-            # Now, reliably get the ID
-            cursor.execute('SELECT id FROM devices WHERE device_name = ?', (device_name,))
             result = cursor.fetchone()
             
-            if cursor.rowcount > 0 and cursor.lastrowid:
+            if result:
                 print(f"✓ New device registered: {device_name} (ID: {result[0]})")
+            else:
+                cursor.execute('SELECT id FROM devices WHERE device_name = ?', (device_name,))
+                result = cursor.fetchone()
             
+            self._device_cache[device_name] = result[0]
             return result[0]
     
     def guess_device_type(self, device_name):
         """Guess device type from name"""
-        name_lower = device_name.lower()
-        if 'key' in name_lower:
-            return 'keys'
-        elif 'bag' in name_lower or 'pack' in name_lower:
-            return 'bag'
-        elif 'valize' in name_lower:
-            return 'luggage'
-        elif 'auto' in name_lower or 'car' in name_lower:
-            return 'vehicle'
-        elif 'wallet' in name_lower or 'portefeu' in name_lower:
-            return 'wallet'
-        else:
-            return 'airtag'
+        return _device_type_for(device_name)
     
     def save_device_location(self, device_name, location_data, screenshot_id):
         """Save location with proper device relationship"""
-        # Get or create device
-        device_id = self.get_or_create_device(device_name)
+        self.save_device_locations([(device_name, location_data)], screenshot_id)
+    
+    def save_device_locations(self, entries, screenshot_id):
+        """Save all (device_name, location_data) pairs of a screenshot in one commit"""
+        location_rows = []
+        last_seen_rows = []
+        for device_name, location_data in entries:
+            # Get or create device
+            device_id = self.get_or_create_device(device_name)
+            location_rows.append((
+                device_id,
+                screenshot_id,
+                location_data.get('distance_meters'),
+                location_data.get('location_text'),
+                location_data.get('latitude'),
+                location_data.get('longitude'),
+                location_data.get('timestamp_unix')
+            ))
+            last_seen_rows.append((location_data.get('timestamp_unix'), device_id))
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.conn.cursor()
         
-        # Insert location
-        cursor.execute('''
+        # Insert locations
+        cursor.executemany('''
             INSERT INTO device_locations (
                 device_id, screenshot_id, distance_meters,
                 location_text, latitude, longitude, timestamp_unix
             ) VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            device_id,
-            screenshot_id,
-            location_data.get('distance_meters'),
-            location_data.get('location_text'),
-            location_data.get('latitude'),
-            location_data.get('longitude'),
-            location_data.get('timestamp_unix')
-        ))
+        ''', location_rows)
         
         # Update device last_seen
-        cursor.execute('''
+        cursor.executemany('''
             UPDATE devices 
             SET last_seen = datetime(?, 'unixepoch')
             WHERE id = ?
-        ''', (location_data.get('timestamp_unix'), device_id))
+        ''', last_seen_rows)
         
-        conn.commit()
-        conn.close()
+        self.conn.commit()
     
     def get_device_history(self, device_name, limit=10):
         """Get location history for a specific device"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.conn.cursor()
         
         cursor.execute('''
             SELECT 
@@ -154,15 +184,15 @@ class ImprovedAirTracker:
         ''', (device_name, limit))
         
         history = cursor.fetchall()
-        conn.close()
         
         return history
     
     def get_all_devices_status(self):
         """Get current status of all devices"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.conn.cursor()
         
+        # Latest row per device: one seek per device on
+        # idx_device_locations_device_ts (device_id, timestamp_unix DESC)
         cursor.execute('''
             SELECT 
                 d.device_name,
@@ -173,25 +203,22 @@ class ImprovedAirTracker:
                 dl.longitude,
                 datetime(dl.timestamp_unix, 'unixepoch', 'localtime') as last_seen
             FROM devices d
-            LEFT JOIN device_locations dl ON d.id = dl.device_id
-            WHERE dl.id = (
-                SELECT id FROM device_locations 
-                WHERE device_id = d.id 
-                ORDER BY timestamp_unix DESC 
+            JOIN device_locations dl ON dl.id = (
+                SELECT id FROM device_locations
+                WHERE device_id = d.id
+                ORDER BY timestamp_unix DESC
                 LIMIT 1
             )
             ORDER BY d.device_name
         ''')
         
         devices = cursor.fetchall()
-        conn.close()
         
         return devices
     
     def find_devices_not_seen_recently(self, minutes=60):
         """Find devices not seen in the last N minutes"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.conn.cursor()
         
         cursor.execute('''
             SELECT 
@@ -207,7 +234,6 @@ class ImprovedAirTracker:
         ''', (minutes,))
         
         missing_devices = cursor.fetchall()
-        conn.close()
         
         return missing_devices
 
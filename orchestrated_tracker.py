@@ -27,7 +27,10 @@ from typing import List, Dict, Optional
 
 from findmy_automation import FindMyAutomation, DeviceType
 from geocoding import Geocoder
-from db import get_connection, init_schema, is_duplicate, sanitize_device_data, resolve_location_alias, resolve_device_alias
+from db import (
+    get_connection, init_schema, is_duplicate, sanitize_device_data, load_device_aliases,
+    INSERT_LOCATION_SQL, UPSERT_DEVICE_SQL, TOUCH_DEVICE_SQL,
+)
 from enrichment import compute_distance_from_home, update_visits, detect_trips
 
 # Night mode / temp wake flags
@@ -108,6 +111,7 @@ class OrchestratedAirTagTracker:
     }
     EXTRACT_PAUSE = 15     # Pause after extracting data
     CYCLE_END_PAUSE = 60   # Pause at end of cycle before repeating
+    TEMP_WAKE_CHECK_INTERVAL = 30  # Max idle sleep in scheduled mode between temp wake checks
 
     # Failure recovery settings
     MAX_CONSECUTIVE_FAILURES = 5
@@ -198,7 +202,8 @@ class OrchestratedAirTagTracker:
 
     def save_locations(self, devices: List[Dict], device_type: DeviceType) -> tuple:
         """
-        Save extracted device locations to the database.
+        Save extracted device locations to the database and detect trips,
+        all in one transaction.
 
         Args:
             devices: List of device dictionaries from Swift extractor
@@ -212,15 +217,25 @@ class OrchestratedAirTagTracker:
 
         saved_count = 0
         saved_device_names = set()
+        location_rows = []  # swift_locations rows, inserted in one executemany
+        device_rows = []  # swift_devices upserts, applied in one executemany
+        touched_rows = []  # duplicates that only refresh swift_devices.last_seen
+        batch_locations = {}  # device_name -> location queued in this batch
+        geocoded_locations = {}  # location text -> (lat, lon), looked up once per batch
+
+        # One clock reading for the whole batch
+        now = datetime.now()
+        now_str = now.strftime('%Y-%m-%d %H:%M:%S')
 
         with get_connection() as conn:
             try:
                 cursor = conn.cursor()
+                device_aliases = load_device_aliases(conn)
 
                 for device_data in devices:
                     # Sanitize: fix decimal-distance parsing, time-in-location,
                     # and skip "No location found" noise
-                    cleaned = sanitize_device_data(dict(device_data))
+                    cleaned = sanitize_device_data(dict(device_data), now=now)
                     if cleaned is None:
                         logger.debug(f"Skipping {device_data['name']}: no usable location")
                         continue
@@ -237,37 +252,19 @@ class OrchestratedAirTagTracker:
                             # Fallback for unexpected formats
                             extracted_at = extracted_at.replace('T', ' ').replace('Z', '')
 
-                    device_name = resolve_device_alias(cleaned['name'])
+                    device_name = device_aliases.get(cleaned['name'], cleaned['name'])
                     location_text = cleaned['location']
 
                     # Skip duplicates within 2-minute window
-                    if is_duplicate(conn, device_name, location_text):
+                    if is_duplicate(conn, device_name, location_text, now=now, pending=batch_locations):
                         logger.debug(f"Skipping duplicate: {device_name} at {location_text}")
                         # Update last_seen in swift_devices, even without a new location record
-                        cursor.execute('''
-                            UPDATE swift_devices SET last_seen = CURRENT_TIMESTAMP
-                            WHERE device_name = ?
-                        ''', (device_name,))
+                        touched_rows.append((device_name,))
                         continue
 
-                    # Resolve alias (e.g. "Home" → "Onderstraat 7, 9000 Ghent")
-                    geocode_text = resolve_location_alias(location_text)
-
-                    # Geocode the resolved address (full structured data)
-                    latitude, longitude = None, None
-                    try:
-                        geo_result = self.geocoder.geocode_full(geocode_text)
-                        if geo_result:
-                            latitude = geo_result['latitude']
-                            longitude = geo_result['longitude']
-                            logger.debug(f"Geocoded {location_text} -> ({latitude:.6f}, {longitude:.6f})")
-                        else:
-                            # Fallback to simple geocode (cache-only hits without structured data)
-                            latitude, longitude = self.geocoder.geocode(geocode_text)
-                            if latitude and longitude:
-                                logger.debug(f"Geocoded (fallback) {location_text} -> ({latitude:.6f}, {longitude:.6f})")
-                    except Exception as e:
-                        logger.warning(f"Geocoding failed for '{geocode_text}': {e}")
+                    latitude, longitude = self.geocoder.geocode_alias(
+                        location_text, conn, seen=geocoded_locations, full=True
+                    )
 
                     # Computed timestamp from relative time (e.g. "15 min ago" → absolute)
                     location_timestamp = cleaned.get('location_timestamp')
@@ -283,14 +280,8 @@ class OrchestratedAirTagTracker:
                     # Battery status (from Swift extractor, may be None)
                     battery_status = cleaned.get('batteryStatus')
 
-                    # Insert location record with device_type
-                    cursor.execute('''
-                        INSERT INTO swift_locations
-                        (device_name, location, time_status, distance, latitude, longitude,
-                         device_type, raw_data, extracted_at, location_timestamp,
-                         distance_from_home_km, battery_status)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
+                    # Queue location record with device_type
+                    location_rows.append((
                         device_name,
                         location_text,
                         cleaned['timeStatus'],
@@ -304,32 +295,34 @@ class OrchestratedAirTagTracker:
                         dist_home,
                         battery_status,
                     ))
+                    batch_locations[device_name] = location_text
 
-                    # Update or insert device summary with device_type
-                    cursor.execute('''
-                        INSERT INTO swift_devices (device_name, device_type, last_location, update_count)
-                        VALUES (?, ?, ?, 1)
-                        ON CONFLICT(device_name) DO UPDATE SET
-                            last_seen = CURRENT_TIMESTAMP,
-                            last_location = excluded.last_location,
-                            device_type = excluded.device_type,
-                            update_count = update_count + 1
-                    ''', (
-                        device_name,
-                        device_type,
-                        location_text
-                    ))
+                    # Queue device summary upsert with device_type
+                    device_rows.append((device_name, device_type, location_text))
 
                     saved_count += 1
                     saved_device_names.add(device_name)
 
                     # Track visit (dwell time) — reuse conn to avoid locking
-                    ts = location_timestamp or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    ts = location_timestamp or now_str
                     try:
                         update_visits(device_name, location_text, latitude, longitude, ts, conn=conn)
                     except Exception as e:
                         logger.warning(f"Visit tracking failed for {device_name}: {e}")
 
+                # Write all queued location records and device summaries
+                cursor.executemany(INSERT_LOCATION_SQL, location_rows)
+                cursor.executemany(UPSERT_DEVICE_SQL, device_rows)
+                cursor.executemany(TOUCH_DEVICE_SQL, touched_rows)
+
+                # Detect trips for each device that had new records (uses resolved
+                # names) in the same transaction, so the whole tab commits once
+                for name in saved_device_names:
+                    try:
+                        detect_trips(name, since_minutes=10, conn=conn)
+                    except Exception as e:
+                        logger.warning(f"Trip detection failed for {name}: {e}")
+
                 conn.commit()
                 logger.info(f"Saved {saved_count}/{len(devices)} {device_type} updates")
                 if saved_count > 0:
@@ -536,8 +529,8 @@ class OrchestratedAirTagTracker:
             else:
                 return False
 
-        self.automation.activate_find_my()
-
+        # switch_to_tab brings Find My to the front itself, so a separate
+        # activate_find_my() here would only cost another osascript launch
         if not self.automation.switch_to_tab(device_type):
             logger.error(f"Failed to switch to {tab_name} tab")
             # Try immediate fix before giving up
@@ -568,25 +561,17 @@ class OrchestratedAirTagTracker:
         # Successful extraction - reset failure counter
         self._reset_failure_count()
 
-        # Log summary
-        logger.info(f"Found {len(devices)} {device_type}(s):")
-        for device in devices:
-            status = f"{device['timeStatus']}, {device['distance']}" if device['distance'] != '-' else device['timeStatus']
-            logger.info(f"  - {device['name']}: {device['location']} ({status})")
+        # Log summary as a single record instead of one per device
+        if logger.isEnabledFor(logging.INFO):
+            summary_lines = [f"Found {len(devices)} {device_type}(s):"]
+            for device in devices:
+                status = f"{device['timeStatus']}, {device['distance']}" if device['distance'] != '-' else device['timeStatus']
+                summary_lines.append(f"  - {device['name']}: {device['location']} ({status})")
+            logger.info("\n".join(summary_lines))
 
-        # Save to database
+        # Save to database (also runs trip detection)
         saved, device_names = self.save_locations(devices, device_type)
 
-        # Detect trips for each device that had new records (uses resolved names)
-        if saved > 0:
-            with get_connection() as conn:
-                for name in device_names:
-                    try:
-                        detect_trips(name, since_minutes=10, conn=conn)
-                    except Exception as e:
-                        logger.warning(f"Trip detection failed for {name}: {e}")
-                conn.commit()
-
         return saved > 0
 
     def run_single_cycle(self) -> bool:
@@ -708,7 +693,12 @@ class OrchestratedAirTagTracker:
                     break
 
                 schedule.run_pending()
-                time.sleep(1)
+                # Sleep until the next run is due instead of waking every second,
+                # but wake often enough to notice an expired temp wake
+                idle = schedule.idle_seconds()
+                if idle is None:
+                    idle = self.TEMP_WAKE_CHECK_INTERVAL
+                time.sleep(min(max(idle, 0), self.TEMP_WAKE_CHECK_INTERVAL))
         except KeyboardInterrupt:
             logger.info("\n\n🛑 Orchestrated tracking stopped by user")
 
@@ -21,6 +21,7 @@ logger = logging.getLogger(__name__)
 # Default retention thresholds
 DEFAULT_RAW_DAYS = 90
 DEFAULT_HOURLY_DAYS = 365
+DEFAULT_NEGATIVE_GEOCODE_HOURS = 24
 
 
 def _load_retention_config() -> dict:
@@ -33,6 +34,16 @@ def _load_retention_config() -> dict:
         return {}
 
 
+def _load_geocoding_config() -> dict:
+    """Load geocoding settings from config.json."""
+    try:
+        with open("config.json", "r") as f:
+            config = json.load(f)
+            return config.get("geocoding", {})
+    except Exception:
+        return {}
+
+
 def aggregate_to_hourly(dry_run: bool = False) -> int:
     """
     Aggregate raw location data older than raw_data_days into hourly summaries.
@@ -141,17 +152,12 @@ def aggregate_to_hourly(dry_run: bool = False) -> int:
                 total_processed += len(group_rows)
 
             if not dry_run:
-                # Delete the raw records we just aggregated
-                ids_to_delete = [r["id"] for r in rows]
-                # Delete in batches to avoid SQLite variable limit
-                batch_size = 500
-                for i in range(0, len(ids_to_delete), batch_size):
-                    batch = ids_to_delete[i:i + batch_size]
-                    placeholders = ",".join("?" * len(batch))
-                    cursor.execute(
-                        f"DELETE FROM swift_locations WHERE id IN ({placeholders})",
-                        batch,
-                    )
+                # Delete the raw records we just aggregated (same predicate as
+                # the SELECT above, in the same transaction)
+                cursor.execute(
+                    "DELETE FROM swift_locations WHERE device_name = ? AND timestamp < ?",
+                    (device_name, cutoff),
+                )
 
         if not dry_run:
             conn.commit()
@@ -261,15 +267,11 @@ def aggregate_to_daily(dry_run: bool = False) -> int:
 
             if not dry_run:
                 # Delete aggregated hourly summaries
-                ids_to_delete = [r["id"] for r in rows]
-                batch_size = 500
-                for i in range(0, len(ids_to_delete), batch_size):
-                    batch = ids_to_delete[i:i + batch_size]
-                    placeholders = ",".join("?" * len(batch))
-                    cursor.execute(
-                        f"DELETE FROM location_summaries WHERE id IN ({placeholders})",
-                        batch,
-                    )
+                cursor.execute(
+                    "DELETE FROM location_summaries "
+                    "WHERE device_name = ? AND period_type = 'hourly' AND period_start < ?",
+                    (device_name, cutoff),
+                )
 
         if not dry_run:
             conn.commit()
@@ -278,12 +280,48 @@ def aggregate_to_daily(dry_run: bool = False) -> int:
         return total_processed
 
 
+def purge_expired_geocoding_failures(dry_run: bool = False) -> int:
+    """
+    Delete failed (NULL-coordinate) geocoding_cache entries older than the
+    negative cache TTL.
+
+    Expired failures are already ignored by the geocoder's cache lookups; this
+    just keeps them from piling up so the location is retried with a clean row.
+
+    Returns:
+        Number of cache entries deleted (or that would be deleted in dry run)
+    """
+    config = _load_geocoding_config()
+    ttl_hours = config.get("negative_cache_hours", DEFAULT_NEGATIVE_GEOCODE_HOURS)
+    # created_at defaults to CURRENT_TIMESTAMP (UTC), so compute the cutoff in SQL
+    cutoff = f"-{ttl_hours} hours"
+
+    with get_connection() as conn:
+        if dry_run:
+            count = conn.execute(
+                "SELECT COUNT(*) FROM geocoding_cache WHERE latitude IS NULL AND created_at < datetime('now', ?)",
+                (cutoff,),
+            ).fetchone()[0]
+            logger.info(f"[DRY RUN] Would delete {count} expired failed geocoding entries")
+            return count
+
+        cursor = conn.execute(
+            "DELETE FROM geocoding_cache WHERE latitude IS NULL AND created_at < datetime('now', ?)",
+            (cutoff,),
+        )
+        conn.commit()
+
+    logger.info(f"Deleted {cursor.rowcount} expired failed geocoding entries")
+    return cursor.rowcount
+
+
 def run_retention(dry_run: bool = False, vacuum: bool = True):
     """
     Run the full retention pipeline:
     1. Aggregate raw data → hourly summaries
     2. Aggregate hourly summaries → daily summaries
-    3. Optionally VACUUM the database
+    3. Purge expired failed geocoding lookups
+    4. Optionally VACUUM the database
 
     Args:
         dry_run: If True, only report what would be done
@@ -293,6 +331,7 @@ def run_retention(dry_run: bool = False, vacuum: bool = True):
 
     hourly_count = aggregate_to_hourly(dry_run=dry_run)
     daily_count = aggregate_to_daily(dry_run=dry_run)
+    purge_expired_geocoding_failures(dry_run=dry_run)
 
     if not dry_run and vacuum and (hourly_count > 0 or daily_count > 0):
         logger.info("Running VACUUM...")
@@ -8,7 +8,7 @@ collected by the Swift accessibility-based tracker.
 
 from fastapi import FastAPI, HTTPException, Query, Path as PathParam, BackgroundTasks, Security, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, StreamingResponse
+from fastapi.responses import HTMLResponse, StreamingResponse, ORJSONResponse
 from fastapi.security import APIKeyHeader
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
@@ -20,6 +20,8 @@ import csv
 import io
 import re
 import os
+import threading
+import time
 
 from db import get_connection, init_schema, DB_PATH
 from enrichment import haversine_km
@@ -70,6 +72,8 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
     dependencies=[Depends(require_api_key)],
+    # orjson encodes the large location lists (and their datetimes) in C
+    default_response_class=ORJSONResponse,
 )
 
 # CORS middleware — restrict to known dashboard origins
@@ -138,6 +142,7 @@ class DeviceHistory(BaseModel):
     device: Device
     locations: List[DeviceLocation]
     total: int
+    next_before: Optional[str] = None  # "<timestamp>|<id>"; pass as ?before= to fetch the next page
 
 class HealthStatus(BaseModel):
     """API health status"""
@@ -251,13 +256,40 @@ class DeviceStatsSummary(BaseModel):
 
 # ─── Helpers ───
 
+_PERIOD_RE = re.compile(r'^(\d+)([dhw])$')
+_UNSAFE_FILENAME_RE = re.compile(r'[^a-zA-Z0-9_-]')
+
+# Location columns plus the structured address from the geocoding cache.
+# sqlite3 caches prepared statements per connection keyed by SQL text, so
+# building queries from shared pieces keeps repeat calls on that cache.
+_LOCATION_COLUMNS_SQL = '''
+    SELECT l.id, l.device_name, l.location, l.time_status, l.distance,
+           l.latitude, l.longitude, l.device_type, l.timestamp, l.extracted_at,
+           l.distance_from_home_km, l.battery_status,
+           gc.street, gc.house_number, gc.postal_code, gc.city, gc.country
+    FROM swift_locations l
+'''
+_ADDRESS_JOIN_SQL = '''
+    LEFT JOIN geocoding_cache gc
+      ON ROUND(l.latitude, 4) = ROUND(gc.latitude, 4)
+      AND ROUND(l.longitude, 4) = ROUND(gc.longitude, 4)
+'''
+_LATEST_LOCATIONS_SQL = _LOCATION_COLUMNS_SQL + '''
+    INNER JOIN (
+        SELECT device_name, MAX(timestamp) as max_timestamp
+        FROM swift_locations GROUP BY device_name
+    ) latest ON l.device_name = latest.device_name AND l.timestamp = latest.max_timestamp
+''' + _ADDRESS_JOIN_SQL + '''
+    ORDER BY l.device_name
+'''
+
 def row_to_dict(row: sqlite3.Row) -> dict:
     """Convert SQLite row to dictionary"""
     return dict(zip(row.keys(), row))
 
 def parse_period(period: str) -> timedelta:
     """Parse period string like '7d', '24h', '1w' to timedelta"""
-    match = re.match(r'^(\d+)([dhw])$', period)
+    match = _PERIOD_RE.match(period)
     if not match:
         raise ValueError(f"Invalid period format: {period}")
     value, unit = match.groups()
@@ -277,6 +309,8 @@ def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     """Calculate distance in meters between two lat/lon points."""
     return haversine_km(lat1, lon1, lat2, lon2) * 1000
 
+_LOCATION_FIELDS = frozenset(DeviceLocation.model_fields)
+
 def _parse_location_row(row) -> DeviceLocation:
     """Parse a swift_locations row into a DeviceLocation."""
     loc_dict = row_to_dict(row)
@@ -284,8 +318,7 @@ def _parse_location_row(row) -> DeviceLocation:
     if loc_dict.get('extracted_at'):
         loc_dict['extracted_at'] = parse_datetime(loc_dict['extracted_at'])
     # Only pass known fields to avoid Pydantic errors from extra DB columns
-    known_fields = {f for f in DeviceLocation.model_fields}
-    filtered = {k: v for k, v in loc_dict.items() if k in known_fields}
+    filtered = {k: v for k, v in loc_dict.items() if k in _LOCATION_FIELDS}
     return DeviceLocation(**filtered)
 
 def _parse_device_row(row) -> Device:
@@ -295,6 +328,35 @@ def _parse_device_row(row) -> Device:
     d['last_seen'] = parse_datetime(d['last_seen'])
     return Device(**d)
 
+
+# Short-lived cache for the endpoints the dashboard polls. The tracker only
+# writes about once a minute, so a few seconds of staleness is invisible.
+RESPONSE_CACHE_TTL_SECONDS = 5.0
+RESPONSE_CACHE_MAX_ENTRIES = 64
+_response_cache: Dict[tuple, tuple] = {}  # key -> (expires_at, response)
+_response_cache_lock = threading.Lock()
+
+def _cached_response(key: tuple, build):
+    """Return the cached response for key, calling build() when missing or expired."""
+    now = time.monotonic()
+    with _response_cache_lock:
+        entry = _response_cache.get(key)
+        if entry and entry[0] > now:
+            return entry[1]
+
+    response = build()
+
+    with _response_cache_lock:
+        if len(_response_cache) >= RESPONSE_CACHE_MAX_ENTRIES:
+            _response_cache.clear()
+        _response_cache[key] = (now + RESPONSE_CACHE_TTL_SECONDS, response)
+    return response
+
+def _invalidate_response_cache():
+    """Drop cached responses after this process changes location data."""
+    with _response_cache_lock:
+        _response_cache.clear()
+
 def _generate_gpx(device_name: str, locations: list) -> str:
     """Generate GPX XML from location records."""
     # Escape XML special characters
@@ -445,8 +507,12 @@ def _maybe_trigger_wake(minutes_since_extraction: Optional[int]) -> bool:
     return _trigger_temp_wake()
 
 
+# Endpoints that query SQLite (or probe the network) are plain `def`: FastAPI
+# runs those in its threadpool, so a slow query doesn't stall the event loop
+# for every other request. Each worker thread reuses its own connections.
+
 @v1.get("/health", response_model=HealthStatus, tags=["General"])
-async def health_check():
+def health_check():
     """Check API and database health"""
     try:
         with get_connection() as conn:
@@ -599,12 +665,20 @@ async def health_check():
 # ─── Devices ───
 
 @v1.get("/devices", response_model=PaginatedResponse, tags=["Devices"])
-async def get_devices(
+def get_devices(
     device_type: Optional[str] = Query(None, description="Filter by device type: person, device, or item"),
     limit: int = Query(50, ge=1, le=500, description="Maximum number of devices"),
     offset: int = Query(0, ge=0, description="Number of records to skip"),
 ):
     """Get all tracked devices with their current status"""
+    return _cached_response(
+        ("devices", device_type, limit, offset),
+        lambda: _query_devices(device_type, limit, offset),
+    )
+
+
+def _query_devices(device_type: Optional[str], limit: int, offset: int) -> PaginatedResponse:
+    """Build the /devices response."""
     with get_connection() as conn:
         cursor = conn.cursor()
 
@@ -650,7 +724,7 @@ async def get_devices(
 
 
 @v1.get("/devices/counts", response_model=DeviceTypeCounts, tags=["Devices"])
-async def get_device_counts():
+def get_device_counts():
     """Get count of devices by type"""
     with get_connection() as conn:
         cursor = conn.cursor()
@@ -679,7 +753,7 @@ async def get_device_counts():
 
 
 @v1.get("/devices/{device_name}", response_model=Device, tags=["Devices"])
-async def get_device(device_name: str = PathParam(..., description="Device name")):
+def get_device(device_name: str = PathParam(..., description="Device name")):
     """Get specific device information"""
     with get_connection() as conn:
         cursor = conn.cursor()
@@ -704,15 +778,31 @@ async def get_device(device_name: str = PathParam(..., description="Device name"
 
 
 @v1.get("/devices/{device_name}/history", response_model=DeviceHistory, tags=["Devices"])
-async def get_device_history(
+def get_device_history(
     device_name: str = PathParam(..., description="Device name"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of locations"),
     offset: int = Query(0, ge=0, description="Number of records to skip"),
     start_date: Optional[datetime] = Query(None, description="Start date filter"),
     end_date: Optional[datetime] = Query(None, description="End date filter"),
+    before: Optional[str] = Query(None, description="Page cursor: next_before from the previous page"),
 ):
-    """Get device location history with optional date-range filtering"""
-    device = await get_device(device_name)
+    """
+    Get device location history with optional date-range filtering.
+
+    For deep paging pass before=<next_before> instead of a growing offset;
+    the cursor seeks into the (device_name, timestamp) index, with the row id
+    breaking ties between equal timestamps. offset is ignored when before is
+    given.
+    """
+    cursor_key = None
+    if before:
+        before_ts, _, before_id = before.rpartition("|")
+        if not before_ts or not before_id.isdigit():
+            raise HTTPException(status_code=400, detail="Invalid before cursor")
+        cursor_key = [before_ts, int(before_id)]
+        offset = 0
+
+    device = get_device(device_name)
 
     with get_connection() as conn:
         cursor = conn.cursor()
@@ -733,27 +823,27 @@ async def get_device_history(
         cursor.execute(f"SELECT COUNT(*) FROM swift_locations l WHERE {where}", params)
         total = cursor.fetchone()[0]
 
+        if cursor_key:
+            where += " AND (l.timestamp, l.id) < (?, ?)"
+            params += cursor_key
+
         cursor.execute(f"""
-            SELECT l.id, l.device_name, l.location, l.time_status, l.distance,
-                   l.latitude, l.longitude, l.device_type, l.timestamp, l.extracted_at,
-                   l.distance_from_home_km, l.battery_status,
-                   gc.street, gc.house_number, gc.postal_code, gc.city, gc.country
-            FROM swift_locations l
-            LEFT JOIN geocoding_cache gc
-              ON ROUND(l.latitude, 4) = ROUND(gc.latitude, 4)
-              AND ROUND(l.longitude, 4) = ROUND(gc.longitude, 4)
+            {_LOCATION_COLUMNS_SQL}
+            {_ADDRESS_JOIN_SQL}
             WHERE {where}
-            ORDER BY l.timestamp DESC
+            ORDER BY l.timestamp DESC, l.id DESC
             LIMIT ? OFFSET ?
         """, params + [limit, offset])
 
-        locations = [_parse_location_row(row) for row in cursor.fetchall()]
+        rows = cursor.fetchall()
+        locations = [_parse_location_row(row) for row in rows]
+        next_before = f"{rows[-1]['timestamp']}|{rows[-1]['id']}" if len(rows) == limit else None
 
-        return DeviceHistory(device=device, locations=locations, total=total)
+        return DeviceHistory(device=device, locations=locations, total=total, next_before=next_before)
 
 
 @v1.get("/devices/{device_name}/export", tags=["Devices"])
-async def export_device(
+def export_device(
     device_name: str = PathParam(..., description="Device name"),
     format: str = Query("json", description="Export format: csv, json, or gpx"),
     start_date: Optional[datetime] = Query(None, description="Start date filter"),
@@ -786,7 +876,7 @@ async def export_device(
     if not rows:
         raise HTTPException(status_code=404, detail=f"No location data for '{device_name}'")
 
-    safe_name = re.sub(r'[^a-zA-Z0-9_-]', '_', device_name)
+    safe_name = _UNSAFE_FILENAME_RE.sub('_', device_name)
 
     if format == "csv":
         output = io.StringIO()
@@ -812,7 +902,7 @@ async def export_device(
 
 
 @v1.get("/devices/{device_name}/trips", response_model=PaginatedResponse, tags=["Devices"])
-async def get_device_trips(
+def get_device_trips(
     device_name: str = PathParam(..., description="Device name"),
     limit: int = Query(50, ge=1, le=500, description="Maximum number of trips"),
     offset: int = Query(0, ge=0, description="Number of records to skip"),
@@ -857,7 +947,7 @@ async def get_device_trips(
 
 
 @v1.get("/devices/{device_name}/visits", response_model=PaginatedResponse, tags=["Devices"])
-async def get_device_visits(
+def get_device_visits(
     device_name: str = PathParam(..., description="Device name"),
     limit: int = Query(50, ge=1, le=500, description="Maximum number of visits"),
     offset: int = Query(0, ge=0, description="Number of records to skip"),
@@ -903,7 +993,7 @@ async def get_device_visits(
 
 
 @v1.get("/devices/{device_name}/zone", response_model=ZoneCheck, tags=["Devices"])
-async def check_device_zone(
+def check_device_zone(
     device_name: str = PathParam(..., description="Device name"),
 ):
     """Check which zone a device is currently in (if any)"""
@@ -938,7 +1028,7 @@ async def check_device_zone(
 
 
 @v1.get("/devices/{device_name}/stats-summary", response_model=DeviceStatsSummary, tags=["Devices"])
-async def get_device_stats_summary(
+def get_device_stats_summary(
     device_name: str = PathParam(..., description="Device name"),
 ):
     """Get summary statistics for a device"""
@@ -1047,30 +1137,21 @@ async def get_device_stats_summary(
 # ─── Locations ───
 
 @v1.get("/locations/latest", response_model=List[DeviceLocation], tags=["Locations"])
-async def get_latest_locations():
+def get_latest_locations():
     """Get the most recent location for each device"""
+    return _cached_response(("locations/latest",), _query_latest_locations)
+
+
+def _query_latest_locations() -> List[DeviceLocation]:
+    """Build the /locations/latest response."""
     with get_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT l.id, l.device_name, l.location, l.time_status, l.distance,
-                   l.latitude, l.longitude, l.device_type, l.timestamp, l.extracted_at,
-                   l.distance_from_home_km, l.battery_status,
-                   gc.street, gc.house_number, gc.postal_code, gc.city, gc.country
-            FROM swift_locations l
-            INNER JOIN (
-                SELECT device_name, MAX(timestamp) as max_timestamp
-                FROM swift_locations GROUP BY device_name
-            ) latest ON l.device_name = latest.device_name AND l.timestamp = latest.max_timestamp
-            LEFT JOIN geocoding_cache gc
-              ON ROUND(l.latitude, 4) = ROUND(gc.latitude, 4)
-              AND ROUND(l.longitude, 4) = ROUND(gc.longitude, 4)
-            ORDER BY l.device_name
-        """)
+        cursor.execute(_LATEST_LOCATIONS_SQL)
         return [_parse_location_row(row) for row in cursor.fetchall()]
 
 
 @v1.get("/locations/search", response_model=PaginatedResponse, tags=["Locations"])
-async def search_locations(
+def search_locations(
     location: Optional[str] = Query(None, description="Location text to search for"),
     device_name: Optional[str] = Query(None, description="Filter by device name"),
     start_date: Optional[datetime] = Query(None, description="Start date filter"),
@@ -1086,7 +1167,14 @@ async def search_locations(
         params: list = []
 
         if location:
-            where_clauses.append("location LIKE ?")
+            # The trigram index serves LIKE with the same case-insensitive
+            # semantics, but only for patterns of at least 3 characters
+            if len(location) >= 3:
+                where_clauses.append(
+                    "id IN (SELECT rowid FROM swift_locations_fts WHERE location LIKE ?)"
+                )
+            else:
+                where_clauses.append("location LIKE ?")
             params.append(f"%{location}%")
         if device_name:
             where_clauses.append("device_name = ?")
@@ -1121,7 +1209,7 @@ async def search_locations(
 
 
 @v1.delete("/locations/{location_id}", tags=["Locations"])
-async def delete_location(location_id: int):
+def delete_location(location_id: int):
     """Delete a single location record"""
     with get_connection() as conn:
         cursor = conn.cursor()
@@ -1129,13 +1217,14 @@ async def delete_location(location_id: int):
         if cursor.rowcount == 0:
             raise HTTPException(status_code=404, detail=f"Location {location_id} not found")
         conn.commit()
+        _invalidate_response_cache()
         return {"success": True, "deleted_id": location_id}
 
 
 # ─── Statistics ───
 
 @v1.get("/stats/{device_name}", response_model=Statistics, tags=["Statistics"])
-async def get_device_stats(
+def get_device_stats(
     device_name: str = PathParam(..., description="Device name"),
     period: str = Query("7d", pattern="^\\d+[dhw]$", description="Time period (e.g., 7d, 24h, 1w)"),
 ):
@@ -1190,7 +1279,7 @@ async def get_device_stats(
 # ─── Zones ───
 
 @v1.get("/zones", response_model=List[Zone], tags=["Zones"])
-async def get_zones():
+def get_zones():
     """List all geofencing zones"""
     with get_connection() as conn:
         cursor = conn.cursor()
@@ -1199,7 +1288,7 @@ async def get_zones():
 
 
 @v1.post("/zones", response_model=Zone, tags=["Zones"])
-async def create_zone(zone: ZoneCreate):
+def create_zone(zone: ZoneCreate):
     """Create a new geofencing zone"""
     with get_connection() as conn:
         cursor = conn.cursor()
@@ -1215,7 +1304,7 @@ async def create_zone(zone: ZoneCreate):
 
 
 @v1.delete("/zones/{zone_id}", tags=["Zones"])
-async def delete_zone(zone_id: int):
+def delete_zone(zone_id: int):
     """Delete a geofencing zone"""
     with get_connection() as conn:
         cursor = conn.cursor()
@@ -1232,7 +1321,8 @@ def _run_tracking():
     """Background tracking task."""
     from swift_tracker import SwiftAirTagTracker
     tracker = SwiftAirTagTracker()
-    tracker.track_once()
+    if tracker.track_once():
+        _invalidate_response_cache()
 
 
 @v1.post("/track", tags=["Actions"])
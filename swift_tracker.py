@@ -30,7 +30,10 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from typing import List, Dict, Optional
 from geocoding import Geocoder
-from db import get_connection, init_schema, is_duplicate, sanitize_device_data, resolve_location_alias
+from db import (
+    get_connection, init_schema, is_duplicate, sanitize_device_data,
+    INSERT_LOCATION_SQL, UPSERT_DEVICE_SQL,
+)
 from enrichment import compute_distance_from_home, update_visits, detect_trips
 
 # Configure logging
@@ -132,6 +135,13 @@ class SwiftAirTagTracker:
             return 0
 
         saved_count = 0
+        location_rows = []  # swift_locations rows, inserted in one executemany
+        device_rows = []  # swift_devices upserts, applied in one executemany
+        batch_locations = {}  # device_name -> location queued in this batch
+        geocoded_locations = {}  # location text -> (lat, lon), looked up once per batch
+
+        now = datetime.now()
+        now_str = now.strftime('%Y-%m-%d %H:%M:%S')
 
         with get_connection() as conn:
             try:
@@ -140,7 +150,7 @@ class SwiftAirTagTracker:
                 for device_data in devices:
                     # Sanitize: fix decimal-distance parsing, time-in-location,
                     # and skip "No location found" noise
-                    cleaned = sanitize_device_data(dict(device_data))
+                    cleaned = sanitize_device_data(dict(device_data), now=now)
                     if cleaned is None:
                         logger.debug(f"Skipping {device_data['name']}: no usable location")
                         continue
@@ -154,21 +164,13 @@ class SwiftAirTagTracker:
                     location_text = cleaned['location']
 
                     # Skip duplicates within 2-minute window
-                    if is_duplicate(conn, device_name, location_text):
+                    if is_duplicate(conn, device_name, location_text, now=now, pending=batch_locations):
                         logger.debug(f"Skipping duplicate: {device_name} at {location_text}")
                         continue
 
-                    # Resolve alias (e.g. "Home" → "Onderstraat 7, 9000 Ghent")
-                    geocode_text = resolve_location_alias(location_text)
-
-                    # Geocode the resolved address
-                    latitude, longitude = None, None
-                    try:
-                        latitude, longitude = self.geocoder.geocode(geocode_text)
-                        if latitude and longitude:
-                            logger.debug(f"Geocoded {location_text} -> ({latitude:.6f}, {longitude:.6f})")
-                    except Exception as e:
-                        logger.warning(f"Geocoding failed for '{geocode_text}': {e}")
+                    latitude, longitude = self.geocoder.geocode_alias(
+                        location_text, conn, seen=geocoded_locations
+                    )
 
                     # Computed timestamp from relative time (e.g. "15 min ago" → absolute)
                     location_timestamp = cleaned.get('location_timestamp')
@@ -184,49 +186,39 @@ class SwiftAirTagTracker:
                     # Battery status (from Swift extractor, may be None)
                     battery_status = cleaned.get('batteryStatus')
 
-                    # Insert location record
-                    cursor.execute('''
-                        INSERT INTO swift_locations
-                        (device_name, location, time_status, distance, latitude, longitude,
-                         raw_data, extracted_at, location_timestamp,
-                         distance_from_home_km, battery_status)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
+                    # Queue location record
+                    location_rows.append((
                         device_name,
                         location_text,
                         cleaned['timeStatus'],
                         cleaned['distance'],
                         latitude,
                         longitude,
+                        None,  # device_type is only known to the orchestrated tracker
                         json.dumps(device_data),  # Store original raw data for debugging
                         extracted_at,
                         location_timestamp,
                         dist_home,
                         battery_status,
                     ))
+                    batch_locations[device_name] = location_text
 
-                    # Update or insert device summary
-                    cursor.execute('''
-                        INSERT INTO swift_devices (device_name, last_location, update_count)
-                        VALUES (?, ?, 1)
-                        ON CONFLICT(device_name) DO UPDATE SET
-                            last_seen = CURRENT_TIMESTAMP,
-                            last_location = excluded.last_location,
-                            update_count = update_count + 1
-                    ''', (
-                        device_name,
-                        location_text
-                    ))
+                    # Queue device summary upsert
+                    device_rows.append((device_name, None, location_text))
 
                     saved_count += 1
 
-                    # Track visit (dwell time)
-                    ts = location_timestamp or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    # Track visit (dwell time) — reuse conn to avoid locking
+                    ts = location_timestamp or now_str
                     try:
-                        update_visits(device_name, location_text, latitude, longitude, ts)
+                        update_visits(device_name, location_text, latitude, longitude, ts, conn=conn)
                     except Exception as e:
                         logger.debug(f"Visit tracking failed for {device_name}: {e}")
 
+                # Write all queued location records and device summaries
+                cursor.executemany(INSERT_LOCATION_SQL, location_rows)
+                cursor.executemany(UPSERT_DEVICE_SQL, device_rows)
+
                 conn.commit()
                 logger.info(f"Saved {saved_count}/{len(devices)} location updates")
 
@@ -253,11 +245,13 @@ class SwiftAirTagTracker:
             logger.warning("No devices found or extraction failed")
             return False
         
-        # Log summary
-        logger.info(f"Found {len(devices)} devices:")
-        for device in devices:
-            status = f"{device['timeStatus']}, {device['distance']}" if device['distance'] != '-' else device['timeStatus']
-            logger.info(f"  - {device['name']}: {device['location']} ({status})")
+        # Log summary as a single record, built only when INFO is enabled
+        if logger.isEnabledFor(logging.INFO):
+            summary_lines = [f"Found {len(devices)} devices:"]
+            for device in devices:
+                status = f"{device['timeStatus']}, {device['distance']}" if device['distance'] != '-' else device['timeStatus']
+                summary_lines.append(f"  - {device['name']}: {device['location']} ({status})")
+            logger.info("\n".join(summary_lines))
         
         # Save to database
         saved = self.save_locations(devices)
@@ -376,7 +370,9 @@ class SwiftAirTagTracker:
         try:
             while True:
                 schedule.run_pending()
-                time.sleep(1)
+                # Sleep until the next run is due instead of waking every second
+                idle = schedule.idle_seconds()
+                time.sleep(max(idle, 0) if idle is not None else 1)
         except KeyboardInterrupt:
             logger.info("Scheduled tracking stopped by user")
 